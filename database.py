@@ -1,39 +1,109 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from db.base import Base
-from db import models
-from passlib.context import CryptContext
-from fastapi import Depends
-from sqlalchemy.orm import Session
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./manager.db"
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-with engine.connect() as conn:
-    result = conn.execute(text("PRAGMA table_info(users);"))
-    columns = [row[1] for row in result.fetchall()]
-    if "raw_password" not in columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN raw_password TEXT;"))
-        print("Колонка raw_password додана")
-    else:
-        # print("Колонка raw_password вже існує")
-        pass
-
-SECRET_KEY = "your_secret_key"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-db: Session = Depends(get_db)
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncSession
+from asyncio import current_task
+import logging
+import time
+from db.base import Base
+from db import models
+from passlib.context import CryptContext
+from fastapi import Depends
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./manager.db"
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, pool_size=20, max_overflow=40, pool_pre_ping=True, pool_recycle=1800, query_cache_size=1200)
+# scoped-сесія на asyncio-таску: спільний пул з'єднань без повного
+# open/close циклу сесії на кожен запит
+SessionFactory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+SessionLocal = async_scoped_session(SessionFactory, scopefunc=current_task)
+
+# Налаштування SQLite раз на з'єднання: WAL не блокує читачів під час
+# запису, synchronous=NORMAL прибирає зайвий fsync на кожен commit
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-20000")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.close()
+
+# Логування запитів довших за 100 мс — щоб регресії планів було видно
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _query_timer_start(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.monotonic()
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _query_timer_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.monotonic() - getattr(context, "_query_start", time.monotonic())
+    if elapsed > 0.1:
+        logging.warning(f"Повільний запит ({elapsed * 1000:.0f} мс): {statement}")
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        result = await conn.execute(text("PRAGMA table_info(users);"))
+        columns = [row[1] for row in result.fetchall()]
+        if "raw_password" in columns:
+            # паролі у відкритому вигляді більше не зберігаємо
+            await conn.execute(text("ALTER TABLE users DROP COLUMN raw_password;"))
+            print("Колонка raw_password видалена")
+        # Функціональні індекси під запити з lower(): без них кожен такий
+        # фільтр — повний скан таблиці
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_books_author_lc ON books(lower(author));"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_books_author_title_lc ON books(lower(author), lower(title));"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_username_lc ON users(lower(username));"))
+        # унікальність пари (author, title) для ON CONFLICT у create-book
+        await conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_books_author_title ON books(author, title);"))
+        # FTS5-індекс для пошуку книг: замість повного скану з ilike('%...%')
+        result = await conn.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='books_fts';"))
+        fts_existed = result.first() is not None
+        await conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, author, content='books', content_rowid='id');"
+        ))
+        await conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+            "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END;"
+        ))
+        await conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+            "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); END;"
+        ))
+        await conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN "
+            "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); "
+            "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END;"
+        ))
+        if not fts_existed:
+            # разове наповнення індексу наявними книгами
+            await conn.execute(text("INSERT INTO books_fts(books_fts) VALUES ('rebuild');"))
+
+SECRET_KEY = "your_secret_key"
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Argon2id (m=46MiB, t=1, p=4 — чотири BLAKE2b-лінії на хеш) як основна
+# схема; bcrypt лишається для перевірки старих хешів і перехешовується при вході
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    argon2__memory_cost=46 * 1024,
+    argon2__time_cost=1,
+    argon2__parallelism=4,
+    bcrypt__rounds=10,
+    bcrypt__ident="2b",
+    deprecated="auto",
+)
+
+async def get_db():
+    session = SessionLocal()
+    try:
+        yield session
+        # один commit на успішний запит замість розсипаних по хендлерах
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await SessionLocal.remove()
+
+db: AsyncSession = Depends(get_db)
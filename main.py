@@ -1,625 +1,826 @@
-# uvicorn main:app --reload
-
-from fastapi import FastAPI, HTTPException, Depends, Form, Cookie, Request, Response, Path
-from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, HTMLResponse
-from starlette import status
-from sqlalchemy.orm import Session
-from typing import Annotated, Optional
-import logging
-from jose import jwt, JWTError
-from datetime import datetime, timedelta
-from sqlalchemy import func
-from db.database import engine, Base, get_db, db, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, pwd_context
-from db.models import UserModel, BookModel
-from db.schemas import User, Book, BookToDelete
-
-app = FastAPI(title="Менеджер бібліотеки книг")
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
-logging.basicConfig(level=logging.INFO)
-
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)):
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Не авторизований", headers={"WWW-Authenticate": "Bearer"})
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Не авторизований")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Не авторизований")
-
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Не авторизований")
-    return user
-
-@app.get("/")
-def root():
-    return RedirectResponse(url="/login")
-
-@app.post("/token")
-def login_for_access_token(
-    response: Response,
-    username: Annotated[str, Form()],
-    password: Annotated[str, Form()],
-    author: Annotated[str, Form()],
-    db: Session = Depends(get_db)
-):
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-
-    try:
-        if not user:
-            return RedirectResponse(url="/login?msg=Невірні%20дані", status_code=status.HTTP_303_SEE_OTHER)
-
-        if not pwd_context.verify(password, user.password):
-            return RedirectResponse(url="/login?msg=Невірні%20дані", status_code=status.HTTP_303_SEE_OTHER)
-
-        if user.author != author:
-            return RedirectResponse(url="/login?msg=Автор%20не%20співпадає", status_code=status.HTTP_303_SEE_OTHER)
-
-    except Exception as e:
-        logging.error(f"Помилка перевірки паролю або автора: {e}")
-        return RedirectResponse(url="/login?msg=Помилка%20перевірки", status_code=status.HTTP_303_SEE_OTHER)
-
-    access_token = create_access_token(data={"sub": user.username})
-    redirect_response = RedirectResponse(url=f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
-    redirect_response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        samesite="lax"
-    )
-    return redirect_response
-
-@app.get("/login")
-def login(
-    request: Request,
-    msg: Optional[str] = None,
-    access_token: Optional[str] = Cookie(default=None),
-    db: Session = Depends(get_db)
-):
-    if access_token:
-        try:
-            payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if username:
-                user = db.query(UserModel).filter(UserModel.username == username).first()
-                if user:
-                    return RedirectResponse(f"/menu/{user.username}", status_code=303)
-            msg = "Не знайдено користувача"
-        except JWTError:
-            msg = "Невірний токен"
-    return templates.TemplateResponse("login.html", {"request": request, "title": "Вхід", "msg": msg})
-
-
-@app.get("/register")
-def register_form(request: Request, msg: Optional[str] = None):
-    return templates.TemplateResponse("register.html", {"request": request, "title": "Реєстрація", "msg": msg})
-
-@app.post("/register")
-def register_user(
-    request: Request,
-    author: str = Form(),
-    username: str = Form(),
-    password: str = Form(),
-    client_id: str = Form(None),
-    client_secret: str = Form(None),
-    db: Session = Depends(get_db)
-):
-    existing_user = db.query(UserModel).filter(UserModel.username == username).first()
-    if existing_user:
-        return RedirectResponse(
-            url=f"/register?msg=Користувач%20'{username}'%20вже%20існує",
-            status_code=status.HTTP_303_SEE_OTHER
-        )
-
-    hashed_password = pwd_context.hash(password)
-
-    new_user = UserModel(
-        username=username,
-        password=hashed_password,
-        raw_password=password,
-        author=author,
-        client_id=client_id,
-        client_secret=client_secret
-    )
-
-    try:
-        db.add(new_user)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        logging.error(f"Помилка при створенні користувача: {e}")
-        return RedirectResponse(
-            url="/register?msg=Помилка%20реєстрації",
-            status_code=status.HTTP_303_SEE_OTHER
-        )
-
-    return RedirectResponse(
-        url="/login?msg=Користувача%20успішно%20створено",
-        status_code=status.HTTP_303_SEE_OTHER
-    )
-
-@app.get("/register-delete")
-def register_delete(request: Request, msg: str | None = None):
-    return templates.TemplateResponse("register-delete.html", {"request": request, "title": "Видалення акаунта", "msg": msg})
-
-@app.post("/register-delete")
-def delete_user_form(
-    username: str = Form(...),
-    password: str = Form(...),
-    db: Session = Depends(get_db)
-):
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if not user or not pwd_context.verify(password, user.password):
-        return RedirectResponse(
-            url="/register-delete?msg=Акаунт%20не%20знайдено",
-            status_code=status.HTTP_303_SEE_OTHER
-        )
-
-    try:
-        db.delete(user)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        logging.error(f"Помилка при видаленні користувача: {e}")
-        return RedirectResponse(
-            url="/register-delete?msg=Помилка%20видалення",
-            status_code=status.HTTP_303_SEE_OTHER
-        )
-
-    return RedirectResponse(
-        url="/login?msg=Акаунт%20успішно%20видалено",
-        status_code=status.HTTP_303_SEE_OTHER
-    )
-
-templates = Jinja2Templates(directory="templates")
-
-@app.get("/menu/{author}")
-def menu(author: str, request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    is_admin = current_user.username.strip().lower() == "admin"
-    return templates.TemplateResponse("menu.html", {
-        "request": request,
-        "title": "Меню",
-        "user": current_user.username,
-        "author": author,
-        "is_admin": is_admin
-    })
-
-@app.get("/setting-user/{author}")
-def setting_user(author: str, request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    return templates.TemplateResponse("setting-user.html", {"request": request, "title": "Налаштування користувача", "user": current_user.username, "author": author})
-
-@app.get("/logout")
-def logout():
-    response = RedirectResponse(url="/login", status_code=302)
-    response.delete_cookie(key="access_token")
-    return response
-
-@app.get("/change-name/{author}")
-def get_change_name_form(author: str, request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    return templates.TemplateResponse("change-name.html", {
-        "request": request,
-        "title": "Змінити налаштування користувача",
-        "user": current_user.username,
-        "author": author
-    })
-
-@app.post("/change-name/{author}")
-def post_change_name(
-    request: Request,
-    new_user: str = Form(),
-    new_password: str = Form(),
-    new_author: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    db_user = db.query(UserModel).filter(UserModel.id == current_user.id).first()
-
-    if not db_user:
-        return templates.TemplateResponse("change-name.html", {
-            "request": request,
-            "title": "Змінити налаштування користувача",
-            "user": current_user.username,
-            "error": "Користувача не знайдено.",
-            "author": current_user.author
-        })
-
-    existing_user = db.query(UserModel).filter(UserModel.username == new_user).first()
-    if existing_user and existing_user.id != current_user.id:
-        return templates.TemplateResponse("change-name.html", {
-            "request": request,
-            "title": "Змінити налаштування користувача",
-            "user": current_user.username,
-            "error": "Ім'я користувача вже зайнято.",
-            "author": current_user.author
-        })
-
-    # обновляем данные
-    if new_author:
-        db_user.author = new_author
-    db_user.username = new_user
-    db_user.password = pwd_context.hash(new_password)
-    db_user.raw_password = new_password
-
-    db.commit()
-
-    # Создаем новый токен для обновленного пользователя
-    access_token = create_access_token(data={"sub": db_user.username})
-
-    response = RedirectResponse(url=f"/setting-user/{db_user.author}", status_code=status.HTTP_303_SEE_OTHER)
-    # Устанавливаем cookie с новым токеном
-    response.set_cookie(key="access_token", value=access_token, httponly=True)
-
-    return response
-
-@app.get("/data-user/{author}")
-def data_user(author: str, request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    return templates.TemplateResponse("data-user.html", {
-        "request": request,
-        "title": "Налаштування користувача",
-        "author": author,
-        "user": current_user.username,
-        "password": current_user.raw_password
-    })
-
-@app.get("/delete-register/{author}")
-def delete_register_get(request: Request, author: str, msg: Optional[str] = None):
-    return templates.TemplateResponse("delete-register.html", {
-        "request": request,
-        "title": "Видалення акаунта",
-        "username": author,
-        "msg": msg
-    })
-
-
-@app.post("/delete-register/{author}")
-def delete_register_post(author: str, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.username == author).first()
-    if not user:
-        return RedirectResponse(f"/delete-register/{author}?msg=Користувача не знайдено", status_code=status.HTTP_303_SEE_OTHER)
-
-    db.delete(user)
-    db.commit()
-    return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
-
-
-@app.get("/create-book/{author}")
-def create_book_page(
-    request: Request,
-    author: str = Path(),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    return templates.TemplateResponse("create-book.html", {
-        "request": request,
-        "title": "Створити книгу",
-        "author": author
-    })
-
-@app.post("/create-book/{author}")
-def create_book_form(
-    request: Request,
-    author: str = Path(),
-    title: str = Form(),
-    pages: int = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    if author != current_user.author:
-        return RedirectResponse("/login", status_code=303)
-    existing = db.query(BookModel).filter(
-        BookModel.title == title,
-        BookModel.author == author
-    ).first()
-    if existing:
-        return templates.TemplateResponse("create-book.html", {
-            "request": request,
-            "title": "Створити книгу",
-            "author": author,
-            "msg": "Книга вже існує"
-        })
-    new_book = BookModel(author=author, title=title, pages=pages)
-    db.add(new_book)
-    db.commit()
-    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/update-book/{author}")
-def update_book(author: str, request: Request):
-    return templates.TemplateResponse("update-book.html", {
-        "request": request, 
-        "title": "Оновити книгу",
-        "author": author
-    })
-
-
-@app.post("/update-book/{author}")
-def update_book_form(
-    author: str,
-    request: Request,
-    old_title: str = Form(),
-    new_title: str = Form(),
-    new_pages: int = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    book = db.query(BookModel).filter_by(
-        title=old_title,
-    ).first()
-
-    if not book:
-        return {"error": "Book not found"}
-    book.title = new_title
-    book.pages = new_pages
-    db.commit()
-
-    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/delete-book/{author}")
-def delete_book_page(author: str, request: Request, msg: Optional[str] = None):
-    return templates.TemplateResponse("delete-book.html", {
-        "request": request,
-        "title": "Видалити книгу",
-        "msg": msg,
-        "author": author
-    })
-
-@app.post("/delete-book/{author}")
-def delete_book_form(
-    author: str,
-    request: Request,
-    title: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    if author != current_user.username:
-        return RedirectResponse("/login", status_code=303)
-
-    book = db.query(BookModel).filter(
-        func.lower(BookModel.author) == author.lower(),
-        func.lower(BookModel.title) == title.lower()
-    ).first()
-
-    if not book:
-        return templates.TemplateResponse("delete-book.html", {
-            "request": request,
-            "title": "Видалити книгу",
-            "msg": "Книгу не знайдено",
-            "author": author
-        })
-
-    db.delete(book)
-    db.commit()
-    
-    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.post("/books/{author}")
-def create_book(book: Book, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user_from_cookie)):
-    existing = db.query(BookModel).filter(BookModel.title == book.title, BookModel.author == book.author).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Книга вже існує")
-
-    new_book = BookModel(title=book.title, author=book.author, pages=book.pages)
-    db.add(new_book)
-    db.commit()
-    return {"message": "Книгу додано"}
-
-@app.put("/books/")
-def update_book(book: Book, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user_from_cookie)):
-    book_db = db.query(BookModel).filter(BookModel.title == book.title, BookModel.author == book.author).first()
-    if not book_db:
-        raise HTTPException(status_code=404, detail="Книгу не знайдено")
-
-    book_db.pages = book.pages
-    db.commit()
-    return {"message": "Книгу оновлено"}
-
-@app.get("/get-books/{author}")
-def get_books_page(request: Request, author: str = "", db: Session = Depends(get_db)):
-    books = None
-    if author:
-        books = db.query(BookModel).filter(BookModel.author.ilike(f"%{author}%")).all()
-    return templates.TemplateResponse("get-books.html", {
-        "request": request,
-        "title": "Знайти книги",
-        "books": books,
-        "author": author
-    })
-
-@app.get("/books/{author}", response_class=HTMLResponse)
-def get_books_by_author(author: str, request: Request, db: Session = Depends(get_db)):
-    books = db.query(BookModel).filter(BookModel.author == author).all()
-    return templates.TemplateResponse("books-author.html", {
-        "request": request,
-        "title": f"Книги автора {author}",
-        "author": author,
-        "books": books
-    })
-
-# Панель админа
-@app.get("/admin-error", response_class=HTMLResponse)
-def admin_error_get(request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    if current_user.username.strip().lower() != "admin":
-        return templates.TemplateResponse("admin-error.html", {
-            "request": request,
-            "author": current_user.username,
-            "title": "Помилка доступу",
-            "user": current_user.username,
-            "msg": "Вибачте, але ця функція доступна лише для адміністратора."
-            
-        })
-    return RedirectResponse(url="/admin", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/admin")
-def admin_panel(request: Request, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    if current_user.username.strip().lower() != "admin":
-        return RedirectResponse(url="/admin-error")
-    
-    return templates.TemplateResponse("admin.html", {
-        "request": request,
-        "title": "Адмін панель",
-        "user": current_user.username,
-        "author": current_user.username
-    })
-
-@app.get("/admin-create-book")
-def create_book_get(request: Request, msg: str | None = None, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    if current_user.username.strip().lower() != "admin":
-        return RedirectResponse(url="/admin-error")
-    
-    return templates.TemplateResponse("admin-create-book.html", {
-        "request": request,
-        "title": "Створення книги",
-        "msg": msg
-    })
-
-@app.post("/admin-create-book")
-def create_book_post(
-    request: Request,
-    title: str = Form(),
-    author: str = Form(),
-    pages: int = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    existing = db.query(BookModel).filter(
-        func.lower(BookModel.title) == title.strip().lower(),
-        func.lower(BookModel.author) == author.strip().lower()
-    ).first()
-    if existing:
-        return templates.TemplateResponse("admin-create-book.html", {
-            "request": request,
-            "title": "Створити книгу",
-            "msg": "Книга вже існує"
-        })
-
-    new_book = BookModel(title=title.strip(), author=author.strip(), pages=pages)
-    db.add(new_book)
-    db.commit()
-    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/admin-update-book")
-def update_book_get(request: Request, msg: str | None = None, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    if current_user.username.strip().lower() != "admin":
-        return RedirectResponse(url="/admin-error")
-    
-    return templates.TemplateResponse("admin-update-book.html", {
-        "request": request,
-        "title": "Оновлення книги",
-        "msg": msg
-    })
-
-@app.post("/admin-update-book")
-def update_book_post(
-    request: Request,
-    old_author: str = Form(),
-    old_title: str = Form(),
-    new_author: str = Form(),
-    new_title: str = Form(),
-    new_pages: int = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    book_db = db.query(BookModel).filter(
-        func.lower(BookModel.author) == old_author.strip().lower(),
-        func.lower(BookModel.title) == old_title.strip().lower()
-    ).first()
-
-    if not book_db:
-        return templates.TemplateResponse("admin-update-book.html", {
-            "request": request,
-            "title": "Оновити книгу",
-            "msg": "Стара книга не знайдена"
-        })
-
-    book_db.author = new_author.strip()
-    book_db.title = new_title.strip()
-    book_db.pages = new_pages
-    db.commit()
-
-    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/admin-delete-book")
-def delete_book_get(request: Request, msg: str | None = None, current_user: UserModel = Depends(get_current_user_from_cookie)):
-    if current_user.username.strip().lower() != "admin":
-        return RedirectResponse(url="/admin-error")
-    
-    return templates.TemplateResponse("admin-delete-book.html", {
-        "request": request,
-        "title": "Видалення книги",
-        "msg": msg
-    })
-
-@app.post("/admin-delete-book")
-def delete_book_post(
-    request: Request,
-    author: str = Form(),
-    title: str = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    book = db.query(BookModel).filter(
-        func.lower(BookModel.author) == author.strip().lower(),
-        func.lower(BookModel.title) == title.strip().lower()
-    ).first()
-
-    if not book:
-        return templates.TemplateResponse("admin-delete-book.html", {
-            "request": request,
-            "title": "Видалити книгу",
-            "msg": "Книгу не знайдено"
-        })
-
-    db.delete(book)
-    db.commit()
-    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
-
-@app.get("/admin-register-delete")
-def user_delete_get(
-    request: Request,
-    db: Session = Depends(get_db),
-    msg: str | None = None,
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    if current_user.username.strip().lower() != "admin":
-        return RedirectResponse(url="/admin-error")
-    users = db.query(UserModel).all()
-    return templates.TemplateResponse("admin-register-delete.html", {
-        "request": request,
-        "title": "Видалення Користувача",
-        "msg": msg,
-        "users": users
-    })
-
-@app.post("/admin-register-delete")
-def user_delete_post(
-    request: Request,
-    username: str = Form(),
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user_from_cookie)
-):
-    user = db.query(UserModel).filter(func.lower(UserModel.username) == username.strip().lower()).first()
-    if not user:
-        return templates.TemplateResponse("admin-register-delete.html", {
-            "request": request,
-            "title": "Видалення Користувача",
-            "msg": f"Користувача {username} не знайдено",
-            "users": db.query(UserModel).all()
-        })
-
-    db.delete(user)
-    db.commit()
-    return RedirectResponse("/admin-register-delete", status_code=status.HTTP_303_SEE_OTHER)
\ No newline at end of file
+# uvicorn main:app --reload
+
+from fastapi import FastAPI, HTTPException, Depends, Form, Cookie, Request, Response, Path
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.templating import Jinja2Templates
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse, HTMLResponse, ORJSONResponse, StreamingResponse
+from starlette import status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
+import hmac
+import logging
+import threading
+import orjson
+import os
+import time
+import jwt
+from cachetools import TTLCache
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from sqlalchemy import bindparam, exists, func, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from db.database import engine, Base, get_db, db, init_db, SessionFactory, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, pwd_context
+from db.models import UserModel, BookModel
+from db.schemas import User, Book, BookToDelete
+
+SECRET_BYTES = SECRET_KEY.encode()
+
+# Гарячі запити як модульні select() з bindparam: компілюються один раз і
+# далі беруться з compiled-query кешу рушія
+_SEL_USER_BY_NAME = select(UserModel).where(UserModel.username == bindparam("u"))
+# авторизації досить трьох колонок — без повного ORM-об'єкта
+_SEL_AUTH_USER = select(UserModel.id, UserModel.username, UserModel.author).where(
+    UserModel.username == bindparam("u")
+)
+# для /token досить кількох колонок — без гідрації повного ORM-об'єкта
+_SEL_LOGIN_USER = select(UserModel.id, UserModel.username, UserModel.password, UserModel.author).where(
+    UserModel.username == bindparam("u")
+)
+_SEL_BOOK_BY_AUTHOR_TITLE = select(BookModel).where(
+    func.lower(BookModel.author) == bindparam("a"),
+    func.lower(BookModel.title) == bindparam("t"),
+)
+_SEL_BOOK_BY_TITLE = select(BookModel).where(BookModel.title == bindparam("t"))
+_SEL_BOOK_EXACT = select(BookModel).where(
+    BookModel.title == bindparam("t"),
+    BookModel.author == bindparam("a"),
+)
+_SEL_BOOKS_BY_AUTHOR = select(BookModel.title, BookModel.pages).where(BookModel.author == bindparam("a"))
+
+app = FastAPI(title="Менеджер бібліотеки книг", default_response_class=ORJSONResponse)
+
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+# Один Jinja2-environment на застосунок: байткод-кеш на диску переживає
+# рестарти, auto_reload вимкнено, щоб не перевіряти mtime на кожен рендер
+_JINJA_CACHE_DIR = "/tmp/jinja_cache"
+os.makedirs(_JINJA_CACHE_DIR, exist_ok=True)
+_jinja_env = Environment(
+    loader=FileSystemLoader("templates"),
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(directory=_JINJA_CACHE_DIR),
+)
+templates = Jinja2Templates(env=_jinja_env)
+logging.basicConfig(level=logging.INFO)
+
+@app.on_event("startup")
+async def startup():
+    # DDL можна вимкнути (RUN_DDL=0), щоб N воркерів не ганяли її щоразу
+    if os.environ.get("RUN_DDL", "1") != "0":
+        await init_db()
+    # bcrypt рахуємо в окремих процесах, щоб не тримати event loop і GIL;
+    # семафор не дає напхати в чергу пулу більше хешів, ніж є ядер
+    app.state.bcrypt_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    app.state.hash_semaphore = asyncio.Semaphore(os.cpu_count())
+    # прогріваємо шаблони, щоб перший запит не платив за компіляцію
+    for name in _jinja_env.list_templates(extensions=["html"]):
+        _jinja_env.get_template(name)
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.bcrypt_pool.shutdown()
+
+# Пер-процесний pepper для ключів кешу перевірки паролів: ключі не мають
+# сенсу поза цим процесом, тож кеш не можна "винести" назовні
+_PEPPER = os.urandom(32)
+_VERIFY_CACHE: dict = {}
+_VERIFY_CACHE_MAX = 4096
+
+# Один глобальний "фіктивний" хеш для невідомих імен: та сама вартість
+# перевірки, що й у справжнього, але без генерації хеша на кожен запит
+_DUMMY_HASH = pwd_context.hash("invalid")
+
+# Обгортки модульного рівня для пулу процесів: зв'язані методи pwd_context
+# не пікляться (passlib будує динамічні класи через handler.using), тож у
+# пул передаємо функції за ім'ям — воркер бере власний імпортований контекст
+def _verify_in_worker(password: str, stored: str) -> bool:
+    return pwd_context.verify(password, stored)
+
+def _hash_in_worker(password: str) -> str:
+    return pwd_context.hash(password)
+
+async def verify_password_cached(cache_key: int | str, password: str, stored: str) -> bool:
+    key = hmac.new(_PEPPER, f"{cache_key}:{password}:{stored}".encode(), hashlib.sha256).digest()
+    hit = _VERIFY_CACHE.get(key)
+    if hit is not None:
+        return hit
+    loop = asyncio.get_running_loop()
+    async with app.state.hash_semaphore:
+        ok = await loop.run_in_executor(app.state.bcrypt_pool, _verify_in_worker, password, stored)
+    if len(_VERIFY_CACHE) >= _VERIFY_CACHE_MAX:
+        _VERIFY_CACHE.clear()
+    _VERIFY_CACHE[key] = ok
+    return ok
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    async with app.state.hash_semaphore:
+        return await loop.run_in_executor(app.state.bcrypt_pool, _hash_in_worker, password)
+
+def create_access_token(data: dict, expires_delta_seconds: int = ACCESS_TOKEN_EXPIRE_MINUTES * 60):
+    to_encode = data.copy()
+    # цілочисельний exp: без datetime-арифметики і конвертації всередині jwt
+    to_encode["exp"] = int(time.time()) + expires_delta_seconds
+    return jwt.encode(to_encode, SECRET_BYTES, algorithm=ALGORITHM)
+
+# Кеш розібраних токенів: той самий cookie використовується десятки разів
+# підряд, нема сенсу щоразу перевіряти підпис заново
+_JWT_CACHE = TTLCache(maxsize=10000, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Кеш користувачів по id: прибирає SELECT на кожен авторизований запит.
+# Інвалідовується при зміні імені та видаленні акаунта
+_USER_CACHE = TTLCache(maxsize=10000, ttl=60)
+
+class AuthUser(NamedTuple):
+    id: int
+    username: str
+    author: str
+
+async def get_current_user_from_cookie(request: Request, db: AsyncSession = Depends(get_db)):
+    token = request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Не авторизований", headers={"WWW-Authenticate": "Bearer"})
+    # ключ кешу — префікс SHA-256 від токена: коротший за сам токен і не
+    # тримає сотні байтів cookie в пам'яті
+    tkey = hashlib.sha256(token.encode()).digest()[:16]
+    hit = _JWT_CACHE.get(tkey)
+    if hit is not None and hit["exp"] > time.time():
+        username = hit["sub"]
+        uid = hit.get("uid")
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_BYTES, algorithms=["HS256"])
+            username: str = payload.get("sub")
+            if username is None:
+                raise HTTPException(status_code=401, detail="Не авторизований")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Не авторизований")
+        uid = payload.get("uid")
+        _JWT_CACHE[tkey] = {"sub": username, "uid": uid, "exp": payload["exp"]}
+
+    if uid is not None:
+        cached = _USER_CACHE.get(uid)
+        if cached is not None:
+            return cached
+
+    row = (await db.execute(_SEL_AUTH_USER, {"u": username})).first()
+    if not row:
+        raise HTTPException(status_code=401, detail="Не авторизований")
+    cached = AuthUser(*row)
+    _USER_CACHE[cached.id] = cached
+    return cached
+
+# Короткий кеш відрендерених GET-сторінок: рендер детермінований відносно
+# контексту, тож повторні кліки по меню віддаються з пам'яті без Jinja.
+# Sync-хендлери читають кеш із threadpool, а post_change_name чистить його
+# з event loop; TTLCache не потокобезпечний, тож доступ — під локом
+# (сам рендер лишається поза ним, щоб не серіалізувати Jinja)
+_PAGE_CACHE = TTLCache(maxsize=2048, ttl=15)
+_PAGE_CACHE_LOCK = threading.Lock()
+
+def cached_page(name: str, key_parts: tuple, context: dict) -> HTMLResponse:
+    key = hashlib.blake2b("|".join(str(p) for p in (name, *key_parts)).encode(), digest_size=16).digest()
+    with _PAGE_CACHE_LOCK:
+        html = _PAGE_CACHE.get(key)
+    if html is None:
+        html = templates.get_template(name).render(context)
+        with _PAGE_CACHE_LOCK:
+            _PAGE_CACHE[key] = html
+    return HTMLResponse(html)
+
+# Сторінки без динаміки (msg відсутній) рендеряться один раз за життя
+# процесу і далі віддаються як готові байти
+_STATIC_PAGES: dict = {}
+
+def static_page(name: str, context: dict) -> HTMLResponse:
+    with _PAGE_CACHE_LOCK:
+        html = _STATIC_PAGES.get(name)
+    if html is None:
+        html = templates.get_template(name).render(context)
+        with _PAGE_CACHE_LOCK:
+            _STATIC_PAGES[name] = html
+    return HTMLResponse(html)
+
+@app.get("/")
+def root():
+    return RedirectResponse(url="/login")
+
+@app.post("/token")
+async def login_for_access_token(
+    response: Response,
+    username: Annotated[str, Form()],
+    password: Annotated[str, Form()],
+    author: Annotated[str, Form()],
+    db: AsyncSession = Depends(get_db)
+):
+    user = (await db.execute(_SEL_LOGIN_USER, {"u": username})).first()
+
+    try:
+        if not user:
+            # невідоме ім'я платить ту саму ціну, що й відоме, включно з
+            # кешем перевірок (ключ — введене ім'я): повторна спроба з тими
+            # самими даними однаково дешева в обох випадках, інакше час
+            # другої відповіді видає, чи існує користувач
+            await verify_password_cached(username, password, _DUMMY_HASH)
+            return RedirectResponse(url="/login?msg=Невірні%20дані", status_code=status.HTTP_303_SEE_OTHER)
+
+        # обидві перевірки рахуємо до розгалуження, без раннього виходу
+        password_ok = await verify_password_cached(user.id, password, user.password)
+        author_ok = hmac.compare_digest((user.author or "").encode(), author.encode())
+
+        if not password_ok:
+            return RedirectResponse(url="/login?msg=Невірні%20дані", status_code=status.HTTP_303_SEE_OTHER)
+
+        if not author_ok:
+            return RedirectResponse(url="/login?msg=Автор%20не%20співпадає", status_code=status.HTTP_303_SEE_OTHER)
+
+        # пароль вірний — перехешовуємо старі (дорожчі) хеші на новий cost
+        if pwd_context.needs_update(user.password):
+            await db.execute(update(UserModel).where(UserModel.id == user.id).values(password=await hash_password(password)))
+            await db.commit()
+
+    except Exception as e:
+        logging.error(f"Помилка перевірки паролю або автора: {e}")
+        return RedirectResponse(url="/login?msg=Помилка%20перевірки", status_code=status.HTTP_303_SEE_OTHER)
+
+    access_token = create_access_token(data={"sub": user.username, "uid": user.id})
+    redirect_response = RedirectResponse(url=f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
+    redirect_response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        samesite="lax"
+    )
+    return redirect_response
+
+@app.get("/login")
+async def login(
+    request: Request,
+    msg: Optional[str] = None,
+    access_token: Optional[str] = Cookie(default=None),
+    db: AsyncSession = Depends(get_db)
+):
+    if access_token:
+        try:
+            payload = jwt.decode(access_token, SECRET_BYTES, algorithms=["HS256"])
+            username: str = payload.get("sub")
+            if username:
+                user = (await db.execute(_SEL_USER_BY_NAME, {"u": username})).scalar_one_or_none()
+                if user:
+                    return RedirectResponse(f"/menu/{user.username}", status_code=303)
+            msg = "Не знайдено користувача"
+        except jwt.InvalidTokenError:
+            msg = "Невірний токен"
+    if msg is None:
+        return static_page("login.html", {"request": request, "title": "Вхід", "msg": None})
+    return templates.TemplateResponse("login.html", {"request": request, "title": "Вхід", "msg": msg})
+
+
+@app.get("/register")
+def register_form(request: Request, msg: Optional[str] = None):
+    if msg is None:
+        return static_page("register.html", {"request": request, "title": "Реєстрація", "msg": None})
+    return templates.TemplateResponse("register.html", {"request": request, "title": "Реєстрація", "msg": msg})
+
+@app.post("/register")
+async def register_user(
+    request: Request,
+    author: str = Form(),
+    username: str = Form(),
+    password: str = Form(),
+    client_id: str = Form(None),
+    client_secret: str = Form(None),
+    db: AsyncSession = Depends(get_db)
+):
+    hashed_password = await hash_password(password)
+
+    # перевірка існування та вставка одним запитом
+    stmt = sqlite_insert(UserModel).values(
+        username=username,
+        password=hashed_password,
+        author=author,
+        client_id=client_id,
+        client_secret=client_secret
+    ).on_conflict_do_nothing(index_elements=["username"]).returning(UserModel.id)
+
+    try:
+        created = (await db.execute(stmt)).first()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logging.error(f"Помилка при створенні користувача: {e}")
+        return RedirectResponse(
+            url="/register?msg=Помилка%20реєстрації",
+            status_code=status.HTTP_303_SEE_OTHER
+        )
+
+    if created is None:
+        return RedirectResponse(
+            url=f"/register?msg=Користувач%20'{username}'%20вже%20існує",
+            status_code=status.HTTP_303_SEE_OTHER
+        )
+
+    return RedirectResponse(
+        url="/login?msg=Користувача%20успішно%20створено",
+        status_code=status.HTTP_303_SEE_OTHER
+    )
+
+@app.get("/register-delete")
+def register_delete(request: Request, msg: str | None = None):
+    if msg is None:
+        return static_page("register-delete.html", {"request": request, "title": "Видалення акаунта", "msg": None})
+    return templates.TemplateResponse("register-delete.html", {"request": request, "title": "Видалення акаунта", "msg": msg})
+
+@app.post("/register-delete")
+async def delete_user_form(
+    username: str = Form(...),
+    password: str = Form(...),
+    db: AsyncSession = Depends(get_db)
+):
+    user = (await db.execute(_SEL_USER_BY_NAME, {"u": username})).scalar_one_or_none()
+    if not user or not await verify_password_cached(user.id, password, user.password):
+        return RedirectResponse(
+            url="/register-delete?msg=Акаунт%20не%20знайдено",
+            status_code=status.HTTP_303_SEE_OTHER
+        )
+
+    try:
+        await db.delete(user)
+        await db.commit()
+        _USER_CACHE.pop(user.id, None)
+    except Exception as e:
+        await db.rollback()
+        logging.error(f"Помилка при видаленні користувача: {e}")
+        return RedirectResponse(
+            url="/register-delete?msg=Помилка%20видалення",
+            status_code=status.HTTP_303_SEE_OTHER
+        )
+
+    return RedirectResponse(
+        url="/login?msg=Акаунт%20успішно%20видалено",
+        status_code=status.HTTP_303_SEE_OTHER
+    )
+
+@app.get("/menu/{author}")
+def menu(author: str, request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    is_admin = current_user.username.strip().lower() == "admin"
+    return cached_page("menu.html", (current_user.id, author, is_admin), {
+        "request": request,
+        "title": "Меню",
+        "user": current_user.username,
+        "author": author,
+        "is_admin": is_admin
+    })
+
+@app.get("/setting-user/{author}")
+def setting_user(author: str, request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    return cached_page("setting-user.html", (current_user.id, author), {"request": request, "title": "Налаштування користувача", "user": current_user.username, "author": author})
+
+@app.get("/logout")
+async def logout(request: Request):
+    # async, щоб pop із _JWT_CACHE ішов з event loop, а не з threadpool:
+    # TTLCache не потокобезпечний, а auth-залежність пише в нього з лупа
+    token = request.cookies.get("access_token")
+    if token:
+        _JWT_CACHE.pop(hashlib.sha256(token.encode()).digest()[:16], None)
+    response = RedirectResponse(url="/login", status_code=302)
+    response.delete_cookie(key="access_token")
+    return response
+
+@app.get("/change-name/{author}")
+def get_change_name_form(author: str, request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    return cached_page("change-name.html", (current_user.id, author), {
+        "request": request,
+        "title": "Змінити налаштування користувача",
+        "user": current_user.username,
+        "author": author
+    })
+
+@app.post("/change-name/{author}")
+async def post_change_name(
+    request: Request,
+    new_user: str = Form(),
+    new_password: str = Form(),
+    new_author: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    db_user = await db.get(UserModel, current_user.id)
+
+    if not db_user:
+        return templates.TemplateResponse("change-name.html", {
+            "request": request,
+            "title": "Змінити налаштування користувача",
+            "user": current_user.username,
+            "error": "Користувача не знайдено.",
+            "author": current_user.author
+        })
+
+    name_taken = await db.scalar(
+        select(exists().where(UserModel.username == new_user, UserModel.id != current_user.id))
+    )
+    if name_taken:
+        return templates.TemplateResponse("change-name.html", {
+            "request": request,
+            "title": "Змінити налаштування користувача",
+            "user": current_user.username,
+            "error": "Ім'я користувача вже зайнято.",
+            "author": current_user.author
+        })
+
+    # обновляем данные
+    if new_author:
+        db_user.author = new_author
+    db_user.username = new_user
+    db_user.password = await hash_password(new_password)
+
+    _USER_CACHE.pop(current_user.id, None)
+    with _PAGE_CACHE_LOCK:
+        _PAGE_CACHE.clear()
+
+    # Создаем новый токен для обновленного пользователя
+    access_token = create_access_token(data={"sub": db_user.username, "uid": db_user.id})
+
+    response = RedirectResponse(url=f"/setting-user/{db_user.author}", status_code=status.HTTP_303_SEE_OTHER)
+    # Устанавливаем cookie с новым токеном
+    response.set_cookie(key="access_token", value=access_token, httponly=True)
+
+    return response
+
+@app.get("/data-user/{author}")
+def data_user(author: str, request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    return cached_page("data-user.html", (current_user.id, author), {
+        "request": request,
+        "title": "Налаштування користувача",
+        "author": author,
+        "user": current_user.username
+    })
+
+@app.get("/delete-register/{author}")
+def delete_register_get(request: Request, author: str, msg: Optional[str] = None):
+    return cached_page("delete-register.html", (author, msg), {
+        "request": request,
+        "title": "Видалення акаунта",
+        "username": author,
+        "msg": msg
+    })
+
+
+@app.post("/delete-register/{author}")
+async def delete_register_post(author: str, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(_SEL_USER_BY_NAME, {"u": author})).scalar_one_or_none()
+    if not user:
+        return RedirectResponse(f"/delete-register/{author}?msg=Користувача не знайдено", status_code=status.HTTP_303_SEE_OTHER)
+
+    await db.delete(user)
+    _USER_CACHE.pop(user.id, None)
+    return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+
+
+@app.get("/create-book/{author}")
+def create_book_page(
+    request: Request,
+    author: str = Path(),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    return cached_page("create-book.html", (author,), {
+        "request": request,
+        "title": "Створити книгу",
+        "author": author
+    })
+
+@app.post("/create-book/{author}")
+async def create_book_form(
+    request: Request,
+    author: str = Path(),
+    title: str = Form(),
+    pages: int = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    if author != current_user.author:
+        return RedirectResponse("/login", status_code=303)
+    stmt = sqlite_insert(BookModel).values(author=author, title=title, pages=pages).on_conflict_do_nothing(
+        index_elements=["author", "title"]
+    ).returning(BookModel.id)
+    created = (await db.execute(stmt)).first()
+    if created is None:
+        return templates.TemplateResponse("create-book.html", {
+            "request": request,
+            "title": "Створити книгу",
+            "author": author,
+            "msg": "Книга вже існує"
+        })
+    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/update-book/{author}")
+def update_book(author: str, request: Request):
+    return cached_page("update-book.html", (author,), {
+        "request": request,
+        "title": "Оновити книгу",
+        "author": author
+    })
+
+
+@app.post("/update-book/{author}")
+async def update_book_form(
+    author: str,
+    request: Request,
+    old_title: str = Form(),
+    new_title: str = Form(),
+    new_pages: int = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    book = (await db.execute(_SEL_BOOK_BY_TITLE, {"t": old_title})).scalars().first()
+
+    if not book:
+        return {"error": "Book not found"}
+    book.title = new_title
+    book.pages = new_pages
+
+    # flush тут, а не в teardown: перейменування може вперти в
+    # uq_books_author_title, і помилку треба показати формою, а не 500
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        return templates.TemplateResponse("update-book.html", {
+            "request": request,
+            "title": "Оновити книгу",
+            "author": author,
+            "msg": "Книга з такою назвою вже існує"
+        })
+
+    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/delete-book/{author}")
+def delete_book_page(author: str, request: Request, msg: Optional[str] = None):
+    return cached_page("delete-book.html", (author, msg), {
+        "request": request,
+        "title": "Видалити книгу",
+        "msg": msg,
+        "author": author
+    })
+
+@app.post("/delete-book/{author}")
+async def delete_book_form(
+    author: str,
+    request: Request,
+    title: str = Form(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    if author != current_user.username:
+        return RedirectResponse("/login", status_code=303)
+
+    book = (await db.execute(_SEL_BOOK_BY_AUTHOR_TITLE, {"a": author.lower(), "t": title.lower()})).scalars().first()
+
+    if not book:
+        return templates.TemplateResponse("delete-book.html", {
+            "request": request,
+            "title": "Видалити книгу",
+            "msg": "Книгу не знайдено",
+            "author": author
+        })
+
+    await db.delete(book)
+
+    return RedirectResponse(f"/menu/{author}", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.post("/books/{author}")
+async def create_book(book: Book, db: AsyncSession = Depends(get_db), current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    new_book = BookModel(title=book.title, author=book.author, pages=book.pages)
+    try:
+        db.add(new_book)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Книга вже існує")
+    return {"message": "Книгу додано"}
+
+@app.put("/books/")
+async def update_book(book: Book, db: AsyncSession = Depends(get_db), current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    book_db = (await db.execute(_SEL_BOOK_EXACT, {"t": book.title, "a": book.author})).scalar_one_or_none()
+    if not book_db:
+        raise HTTPException(status_code=404, detail="Книгу не знайдено")
+
+    book_db.pages = book.pages
+    return {"message": "Книгу оновлено"}
+
+@app.get("/get-books/{author}")
+async def get_books_page(request: Request, author: str = "", db: AsyncSession = Depends(get_db)):
+    books = None
+    if author:
+        # префіксний пошук по FTS5-індексу замість скану з ilike('%...%')
+        q = author.replace('"', '""')
+        books = (await db.execute(
+            text("SELECT b.title, b.pages FROM books b JOIN books_fts f ON b.id = f.rowid WHERE books_fts MATCH :q"),
+            {"q": f'author:"{q}"*'},
+        )).all()
+    return templates.TemplateResponse("get-books.html", {
+        "request": request,
+        "title": "Знайти книги",
+        "books": books,
+        "author": author
+    })
+
+@app.get("/books/{author}", response_class=HTMLResponse)
+async def get_books_by_author(author: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # для API-клієнтів — потоковий NDJSON без матеріалізації всього списку
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        # тіло стрімиться вже після teardown get_db (request-сесія на той
+        # момент закрита), тож курсор живе на власній сесії з того ж пулу
+        async def gen():
+            async with SessionFactory() as stream_db:
+                result = await stream_db.stream(_SEL_BOOKS_BY_AUTHOR.execution_options(yield_per=500), {"a": author})
+                async for title, pages in result:
+                    yield orjson.dumps({"title": title, "pages": pages}) + b"\n"
+
+        return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+    books = (await db.execute(_SEL_BOOKS_BY_AUTHOR, {"a": author})).all()
+    return templates.TemplateResponse("books-author.html", {
+        "request": request,
+        "title": f"Книги автора {author}",
+        "author": author,
+        "books": books
+    })
+
+# Панель админа
+@app.get("/admin-error", response_class=HTMLResponse)
+def admin_error_get(request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    if current_user.username.strip().lower() != "admin":
+        return templates.TemplateResponse("admin-error.html", {
+            "request": request,
+            "author": current_user.username,
+            "title": "Помилка доступу",
+            "user": current_user.username,
+            "msg": "Вибачте, але ця функція доступна лише для адміністратора."
+
+        })
+    return RedirectResponse(url="/admin", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/admin")
+def admin_panel(request: Request, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    if current_user.username.strip().lower() != "admin":
+        return RedirectResponse(url="/admin-error")
+
+    return cached_page("admin.html", (current_user.id,), {
+        "request": request,
+        "title": "Адмін панель",
+        "user": current_user.username,
+        "author": current_user.username
+    })
+
+@app.get("/admin-create-book")
+def create_book_get(request: Request, msg: str | None = None, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    if current_user.username.strip().lower() != "admin":
+        return RedirectResponse(url="/admin-error")
+
+    return cached_page("admin-create-book.html", (msg,), {
+        "request": request,
+        "title": "Створення книги",
+        "msg": msg
+    })
+
+@app.post("/admin-create-book")
+async def create_book_post(
+    request: Request,
+    title: str = Form(),
+    author: str = Form(),
+    pages: int = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    stmt = sqlite_insert(BookModel).values(title=title.strip(), author=author.strip(), pages=pages).on_conflict_do_nothing(
+        index_elements=["author", "title"]
+    ).returning(BookModel.id)
+    created = (await db.execute(stmt)).first()
+    if created is None:
+        return templates.TemplateResponse("admin-create-book.html", {
+            "request": request,
+            "title": "Створити книгу",
+            "msg": "Книга вже існує"
+        })
+    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/admin-update-book")
+def update_book_get(request: Request, msg: str | None = None, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    if current_user.username.strip().lower() != "admin":
+        return RedirectResponse(url="/admin-error")
+
+    return cached_page("admin-update-book.html", (msg,), {
+        "request": request,
+        "title": "Оновлення книги",
+        "msg": msg
+    })
+
+@app.post("/admin-update-book")
+async def update_book_post(
+    request: Request,
+    old_author: str = Form(),
+    old_title: str = Form(),
+    new_author: str = Form(),
+    new_title: str = Form(),
+    new_pages: int = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    book_db = (await db.execute(_SEL_BOOK_BY_AUTHOR_TITLE, {"a": old_author.strip().lower(), "t": old_title.strip().lower()})).scalars().first()
+
+    if not book_db:
+        return templates.TemplateResponse("admin-update-book.html", {
+            "request": request,
+            "title": "Оновити книгу",
+            "msg": "Стара книга не знайдена"
+        })
+
+    book_db.author = new_author.strip()
+    book_db.title = new_title.strip()
+    book_db.pages = new_pages
+
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        return templates.TemplateResponse("admin-update-book.html", {
+            "request": request,
+            "title": "Оновити книгу",
+            "msg": "Така книга вже існує"
+        })
+
+    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/admin-delete-book")
+def delete_book_get(request: Request, msg: str | None = None, current_user: AuthUser = Depends(get_current_user_from_cookie)):
+    if current_user.username.strip().lower() != "admin":
+        return RedirectResponse(url="/admin-error")
+
+    return cached_page("admin-delete-book.html", (msg,), {
+        "request": request,
+        "title": "Видалення книги",
+        "msg": msg
+    })
+
+@app.post("/admin-delete-book")
+async def delete_book_post(
+    request: Request,
+    author: str = Form(),
+    title: str = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    book = (await db.execute(_SEL_BOOK_BY_AUTHOR_TITLE, {"a": author.strip().lower(), "t": title.strip().lower()})).scalars().first()
+
+    if not book:
+        return templates.TemplateResponse("admin-delete-book.html", {
+            "request": request,
+            "title": "Видалити книгу",
+            "msg": "Книгу не знайдено"
+        })
+
+    await db.delete(book)
+    return RedirectResponse("/admin", status_code=status.HTTP_303_SEE_OTHER)
+
+@app.get("/admin-register-delete")
+async def user_delete_get(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    msg: str | None = None,
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    if current_user.username.strip().lower() != "admin":
+        return RedirectResponse(url="/admin-error")
+    users = (await db.execute(select(UserModel.id, UserModel.username, UserModel.author))).all()
+    return templates.TemplateResponse("admin-register-delete.html", {
+        "request": request,
+        "title": "Видалення Користувача",
+        "msg": msg,
+        "users": users
+    })
+
+@app.post("/admin-register-delete")
+async def user_delete_post(
+    request: Request,
+    username: str = Form(),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user_from_cookie)
+):
+    user = (await db.execute(select(UserModel).where(func.lower(UserModel.username) == username.strip().lower()))).scalars().first()
+    if not user:
+        return templates.TemplateResponse("admin-register-delete.html", {
+            "request": request,
+            "title": "Видалення Користувача",
+            "msg": f"Користувача {username} не знайдено",
+            "users": (await db.execute(select(UserModel.id, UserModel.username, UserModel.author))).all()
+        })
+
+    await db.delete(user)
+    _USER_CACHE.pop(user.id, None)
+    return RedirectResponse("/admin-register-delete", status_code=status.HTTP_303_SEE_OTHER)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, UniqueConstraint
 from db.base import Base
 
 class UserModel(Base):
@@ -8,12 +8,12 @@ class UserModel(Base):
     author = Column(String, nullable=True)
     username = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
-    raw_password = Column(String, nullable=True)
     client_id = Column(String, nullable=True)
     client_secret = Column(String, nullable=True)
 
 class BookModel(Base):
     __tablename__ = "books"
+    __table_args__ = (UniqueConstraint("author", "title", name="uq_books_author_title"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
@@ -1,38 +1,27 @@
-from pydantic import BaseModel, Field
-from typing import Union
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-
-class User(BaseModel):
-    username: str
-    password: str
-    client_id: Optional[str] = None
-    client_secret: Optional[str] = None
-
-
-class Book(BaseModel):
-    author: str = Field(..., min_length=3, max_length=30)
-    title: str = Field(..., min_length=1)
-    pages: int = Field(..., gt=10)
-
-class BookToDelete(BaseModel):
-    author: str
-    title: str
-
-# С автором
-
-# class User(BaseModel):
-    # author: Optional[str] = None
-    # username: str
-    # password: str
-    # client_id: Optional[str] = None
-    # client_secret: Optional[str] = None
-# 
-# 
-# class Book(BaseModel):
-    # title: str = Field(..., min_length=1)
-    # pages: int = Field(..., gt=10)
-# 
-# class BookToDelete(BaseModel):
-    # title: str
-# 
\ No newline at end of file
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated
+from typing import Optional
+
+# DTO незмінні після валідації: frozen вмикає фіксовану структуру замість
+# dict, extra="forbid" відсікає зайві поля ще у pydantic-core
+class User(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    username: str
+    password: str
+    client_id: Optional[str] = None
+    client_secret: Optional[str] = None
+
+
+class Book(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    author: Annotated[str, StringConstraints(min_length=3, max_length=30)]
+    title: Annotated[str, StringConstraints(min_length=1)]
+    pages: Annotated[int, Field(gt=10)]
+
+class BookToDelete(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    author: str
+    title: str